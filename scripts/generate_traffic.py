@@ -0,0 +1,127 @@
+# scripts/generate_traffic.py
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter
+import httpx
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('traffic-generator')
+
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+
+class TokenBucket:
+    """Rate limiter that refills `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        # Allow ~100ms worth of burst so sleep jitter doesn't cost throughput
+        self.capacity = capacity or max(1.0, rate / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def random_house():
+    """Build a random payload that passes HousePredictionRequest validation."""
+    return {
+        "sqft": random.randint(1050, 4950),
+        "bedrooms": random.randint(1, 6),
+        "bathrooms": random.choice([1, 1.5, 2, 2.5, 3, 3.5, 4]),
+        "location": random.choice(["Rural", "Suburb", "Urban", "Downtown", "Waterfront", "Mountain"]),
+        "year_built": random.randint(1945, 2023),
+        "condition": random.choice(["Poor", "Fair", "Good", "Excellent"]),
+        "price_per_sqft": random.randrange(100, 810, 10),
+    }
+
+async def send_get(client):
+    response = await client.get("/health")
+    logger.debug(f"GET /health -> {response.status_code}")
+    return response.status_code
+
+async def send_post(client):
+    response = await client.post("/predict", json=random_house())
+    logger.debug(f"POST /predict -> {response.status_code}")
+    return response.status_code
+
+async def health_loop(client):
+    """Check /health once per second, independently of the prediction rate."""
+    while True:
+        try:
+            status = await send_get(client)
+            if status != 200:
+                logger.warning(f"GET /health -> {status}")
+        except httpx.HTTPError as e:
+            logger.warning(f"GET /health failed: {e!r}")
+        await asyncio.sleep(1)
+
+async def report_loop(stats):
+    """Log the achieved request rate and status codes every second."""
+    while True:
+        await asyncio.sleep(1)
+        total = sum(stats.values())
+        logger.info(f"{total} predictions/s {dict(stats)}")
+        stats.clear()
+
+async def run_traffic(api_url, rps, concurrency):
+    """Send POST /predict at `rps` requests per second with at most `concurrency` in flight."""
+    bucket = TokenBucket(rps)
+    in_flight = asyncio.Semaphore(concurrency)
+    stats = Counter()
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+
+    async def predict(client):
+        try:
+            stats[await send_post(client)] += 1
+        except httpx.HTTPError as e:
+            stats[type(e).__name__] += 1
+        finally:
+            in_flight.release()
+
+    async with httpx.AsyncClient(base_url=api_url, limits=limits) as client:
+        logger.info(f"Sending {rps} predictions/s to {api_url} (max {concurrency} in flight)")
+        background = [asyncio.create_task(health_loop(client)), asyncio.create_task(report_loop(stats))]
+        pending = set()
+        try:
+            while True:
+                await bucket.acquire()
+                # Backpressure: when the API falls behind, wait instead of piling up requests
+                await in_flight.acquire()
+                task = asyncio.create_task(predict(client))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            for task in background + list(pending):
+                task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate traffic against the house price API.')
+    parser.add_argument('--api-url', default=API_URL, help='Base URL of the FastAPI service')
+    parser.add_argument('--rps', type=float, default=2, help='Target prediction requests per second')
+    parser.add_argument('--concurrency', type=int, default=16, help='Maximum prediction requests in flight')
+
+    args = parser.parse_args()
+    if args.rps <= 0 or args.concurrency < 1:
+        parser.error("--rps must be positive and --concurrency at least 1")
+
+    try:
+        asyncio.run(run_traffic(args.api_url, args.rps, args.concurrency))
+    except KeyboardInterrupt:
+        logger.info("Traffic generation stopped")
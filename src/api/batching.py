@@ -0,0 +1,66 @@
+import asyncio
+
+class Batcher:
+    """
+    Coalesce concurrent prediction requests into a single batch call.
+
+    Requests submitted within max_wait_ms of the first one in a batch (up to
+    max_batch of them) are handed to predict_fn together, and each caller gets
+    its own result back.
+    """
+
+    def __init__(self, predict_fn, max_batch: int = 32, max_wait_ms: float = 5):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.worker = None
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one item, then keep collecting until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                # Run the model off the event loop so the next batch can keep filling up
+                results = await asyncio.to_thread(self.predict_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                # The caller may have gone away (client disconnect cancels its future)
+                if not future.done():
+                    future.set_result(result)
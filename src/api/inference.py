@@ -1,82 +1,409 @@
+import itertools
 import joblib
+import logging
+import numpy as np
 import pandas as pd
 import os
+import time
+import typing
 from datetime import datetime
 from pathlib import Path
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.tree import BaseDecisionTree
 from .schemas import HousePredictionRequest, PredictionResponse
+from .utils import LRUCache
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+logger = logging.getLogger(__name__)
 
 MODEL_PATH = "models/trained/house_price_model.pkl"
+ONNX_MODEL_PATH = "models/trained/house_price_model.onnx"
 PREPROCESSOR_PATH = "models/trained/preprocessor.pkl"
 
-try:
-    print(f"🔍 Looking for model at: {MODEL_PATH}")
-    print(f"🔍 Current working directory: {os.getcwd()}")
-    print(f"🔍 Files in current directory: {os.listdir('.')}")
-    
-    # Verificar si el directorio models existe
-    if os.path.exists("models/trained"):
-        print(f"✅ models/trained directory exists")
-        print(f"📁 Files in models/trained: {os.listdir('models/trained')}")
-    else:
-        print("❌ models/trained directory does not exist")
-    
-    model = joblib.load(MODEL_PATH)
-    preprocessor = joblib.load(PREPROCESSOR_PATH)
-    print(f"✅ Model loaded: {type(model).__name__}")
-    print(f"✅ Preprocessor loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading model or preprocessor: {str(e)}")
-    raise RuntimeError(f"Error loading model or preprocessor: {str(e)}")
+# Used when a request does not send price_per_sqft (the Streamlit app's per-location defaults)
+LOCATION_PRICE_ESTIMATES = {
+    "Rural": 180,
+    "Suburb": 320,
+    "Urban": 280,
+    "Downtown": 350,
+    "Waterfront": 450,
+    "Mountain": 250,
+}
 
-def predict_price(request: HousePredictionRequest) -> PredictionResponse:
+# Request fields the preprocessor one-hot encodes
+CATEGORICAL_FIELDS = ('location', 'condition')
+
+# Numeric features numerical_columns() can produce
+NUMERICAL_FEATURES = ('sqft', 'bedrooms', 'bathrooms', 'price_per_sqft', 'house_age', 'bed_bath_ratio')
+
+# Raw request columns in the order transform_requests builds its DataFrame
+INPUT_COLUMNS = ('sqft', 'bedrooms', 'bathrooms', 'location', 'year_built', 'condition', 'price_per_sqft')
+
+# Multipliers for [predicted_price, lower bound, upper bound] (10% confidence range)
+CONFIDENCE_FACTORS = np.array([1.0, 0.9, 1.1])
+
+# Repeated inputs (Streamlit sliders, traffic generator) skip the model entirely
+PREDICTION_CACHE_SIZE = 4096
+prediction_cache = LRUCache(maxsize=PREDICTION_CACHE_SIZE)
+
+# house_age only needs the year, so the clock is re-read at most once an hour
+YEAR_REFRESH_SECONDS = 3600
+_current_year = datetime.now().year
+_year_cached_at = time.monotonic()
+
+def current_year() -> int:
     """
-    Predict house price based on input features.
+    Return the current year, cached for YEAR_REFRESH_SECONDS.
     """
-    try:
-        # ✅ PASO 1: Crear DataFrame con TODOS los datos
-        input_data = pd.DataFrame([{
-            'sqft': request.sqft,
-            'bedrooms': request.bedrooms,
-            'bathrooms': request.bathrooms,
-            'location': request.location,
-            'year_built': request.year_built,
-            'condition': request.condition,
-            'price_per_sqft': request.price_per_sqft
-        }])
-        
-        # ✅ PASO 2: Calcular features derivadas
-        current_year = datetime.now().year
-        input_data['house_age'] = current_year - input_data['year_built']
-        input_data['bed_bath_ratio'] = input_data['bedrooms'] / input_data['bathrooms']
-        
-        # ✅ PASO 3: Aplicar preprocessing
-        processed_features = preprocessor.transform(input_data)
-        
-        # ✅ PASO 4: Hacer predicción
-        predicted_price = model.predict(processed_features)[0]
-        
-        # Convert to Python float and round
-        predicted_price = round(float(predicted_price), 2)
-        
-        # Confidence interval (10% range)
-        confidence_interval = [
-            round(predicted_price * 0.9, 2), 
-            round(predicted_price * 1.1, 2)
-        ]
-        
-        return PredictionResponse(
-            predicted_price=predicted_price,
-            confidence_interval=confidence_interval,
-            features_importance={},
-            prediction_time=datetime.now().isoformat()
+    global _current_year, _year_cached_at
+    now = time.monotonic()
+    if now - _year_cached_at > YEAR_REFRESH_SECONDS:
+        _current_year = datetime.now().year
+        _year_cached_at = now
+    return _current_year
+
+def resolve_price_per_sqft(request: HousePredictionRequest) -> float:
+    """
+    Return the request's price_per_sqft, or the location default when it is omitted.
+    """
+    if request.price_per_sqft is not None:
+        return request.price_per_sqft
+    return LOCATION_PRICE_ESTIMATES[request.location]
+
+def load_onnx_session(path):
+    """
+    Open an ONNX Runtime session for the exported model, if both are available.
+    """
+    if ort is None or not os.path.exists(path):
+        return None
+
+    # Requests are batched across callers, so a single thread per run is enough
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+def model_feature_dtype(model, onnx_session):
+    """
+    Pick the dtype of the encoded feature matrix.
+
+    ONNX Runtime and sklearn trees (single trees, forests, GradientBoosting)
+    evaluate splits in float32, so building the matrix in float32 gives the
+    same predictions with half the memory and no conversion copy. Every other
+    model keeps float64.
+    """
+    if onnx_session is not None:
+        return np.float32
+    trees = np.ravel(getattr(model, 'estimators_', model))
+    if all(isinstance(tree, BaseDecisionTree) for tree in trees):
+        return np.float32
+    return np.float64
+
+# Loaded once per process by load_artifacts() (called from the API lifespan handler)
+model = None
+preprocessor = None
+onnx_session = None
+feature_dtype = np.float64
+feature_layout = None
+
+def build_feature_layout(preprocessor):
+    """
+    Introspect the fitted ColumnTransformer so a request can be encoded
+    straight into a numpy row, without building a DataFrame.
+
+    Returns None when the preprocessor contains steps that the fast path
+    does not reproduce; callers then fall back to preprocessor.transform.
+    """
+    # Only the shape created by features/engineer.py is supported:
+    # 'num' Pipeline, 'cat' Pipeline with a single OneHotEncoder, remainder dropped
+    if not isinstance(preprocessor, ColumnTransformer):
+        return None
+    transformers = {name: transformer for name, transformer, _ in preprocessor.transformers_}
+    columns = {name: cols for name, _, cols in preprocessor.transformers_}
+    if set(transformers) - {'num', 'cat', 'remainder'} or not {'num', 'cat'} <= set(transformers):
+        return None
+    if transformers.get('remainder', 'drop') != 'drop':
+        return None
+    numerical_pipeline, categorical_pipeline = transformers['num'], transformers['cat']
+    if not isinstance(numerical_pipeline, Pipeline) or not isinstance(categorical_pipeline, Pipeline):
+        return None
+    if len(categorical_pipeline.steps) != 1 or not isinstance(categorical_pipeline.steps[0][1], OneHotEncoder):
+        return None
+    onehot = categorical_pipeline.steps[0][1]
+    # Categorical values are read straight off the request, so only request fields work
+    if isinstance(columns['cat'], str) or not set(columns['cat']) <= set(CATEGORICAL_FIELDS):
+        return None
+    if isinstance(columns['num'], str) or not set(columns['num']) <= set(NUMERICAL_FEATURES):
+        return None
+    n_numerical = len(columns['num'])
+
+    # Freeze the numerical pipeline into constants: imputers first, then at most one scaler
+    fill, shift, scale = None, np.zeros(n_numerical), np.ones(n_numerical)
+    scaled = False
+    for _, step in numerical_pipeline.steps:
+        if isinstance(step, SimpleImputer) and not scaled and not step.add_indicator:
+            if fill is None:
+                fill = np.asarray(step.statistics_, dtype=np.float64)
+        elif isinstance(step, StandardScaler) and not scaled:
+            if step.with_mean:
+                shift = step.mean_
+            if step.with_std:
+                scale = step.scale_
+            scaled = True
+        else:
+            return None
+    if onehot.drop is not None or onehot.min_frequency is not None or onehot.max_categories is not None:
+        return None
+
+    # Absolute output column of every known category, e.g. {'location': {'Downtown': 6, ...}}
+    offset = preprocessor.output_indices_['cat'].start
+    onehot_index = {}
+    for column, categories in zip(columns['cat'], onehot.categories_):
+        onehot_index[column] = {category: offset + i for i, category in enumerate(categories)}
+        offset += len(categories)
+
+    return {
+        'numerical_features': list(columns['num']),
+        'numerical_offset': preprocessor.output_indices_['num'].start,
+        'numerical_fill': fill,
+        'numerical_shift': shift,
+        'numerical_scale': scale,
+        'onehot_index': onehot_index,
+        'onehot_ignore_unknown': onehot.handle_unknown != 'error',
+        'n_features': max(indices.stop for indices in preprocessor.output_indices_.values()),
+    }
+
+def numerical_columns(requests: list[HousePredictionRequest]) -> dict:
+    """
+    Gather the numeric request fields into arrays and derive house_age and
+    bed_bath_ratio for the whole batch at once.
+    """
+    n = len(requests)
+    sqft = np.fromiter((request.sqft for request in requests), dtype=np.float64, count=n)
+    bedrooms = np.fromiter((request.bedrooms for request in requests), dtype=np.float64, count=n)
+    bathrooms = np.fromiter((request.bathrooms for request in requests), dtype=np.float64, count=n)
+    year_built = np.fromiter((request.year_built for request in requests), dtype=np.float64, count=n)
+    price_per_sqft = np.fromiter((resolve_price_per_sqft(request) for request in requests), dtype=np.float64, count=n)
+
+    return {
+        'sqft': sqft,
+        'bedrooms': bedrooms,
+        'bathrooms': bathrooms,
+        'price_per_sqft': price_per_sqft,
+        'house_age': current_year() - year_built,
+        'bed_bath_ratio': bedrooms / bathrooms,
+    }
+
+def encode_requests(requests: list[HousePredictionRequest]) -> np.ndarray:
+    """
+    Encode requests into the (n_requests, n_features) matrix the model expects.
+    """
+    features = np.zeros((len(requests), feature_layout['n_features']), dtype=feature_dtype)
+
+    # Numeric block is computed in float64 (like the preprocessor) and cast on assignment
+    columns = numerical_columns(requests)
+    numerical = np.column_stack([columns[feature] for feature in feature_layout['numerical_features']])
+    if feature_layout['numerical_fill'] is not None:
+        np.copyto(numerical, feature_layout['numerical_fill'], where=np.isnan(numerical))
+    numerical -= feature_layout['numerical_shift']
+    numerical /= feature_layout['numerical_scale']
+
+    offset = feature_layout['numerical_offset']
+    features[:, offset:offset + numerical.shape[1]] = numerical
+
+    # One-hot block: look up each category's output column, then set all bits in one write
+    rows = np.arange(len(requests))
+    for feature, index in feature_layout['onehot_index'].items():
+        columns = np.fromiter((index.get(getattr(request, feature), -1) for request in requests),
+                              dtype=np.intp, count=len(requests))
+        known = columns >= 0
+        if not known.all() and not feature_layout['onehot_ignore_unknown']:
+            # Let sklearn apply (and report) its own handle_unknown behaviour
+            return transform_requests(requests)
+        # Unknown categories stay all-zero, same as OneHotEncoder(handle_unknown='ignore')
+        features[rows[known], columns[known]] = 1.0
+
+    return features
+
+def transform_requests(requests: list[HousePredictionRequest]):
+    """
+    Build the input DataFrame and run it through the fitted preprocessor.
+    """
+    input_data = pd.DataFrame.from_records([
+        (
+            request.sqft,
+            request.bedrooms,
+            request.bathrooms,
+            request.location,
+            request.year_built,
+            request.condition,
+            resolve_price_per_sqft(request),
+        )
+        for request in requests
+    ], columns=INPUT_COLUMNS)
+
+    year = current_year()
+    input_data['house_age'] = year - input_data['year_built']
+    input_data['bed_bath_ratio'] = input_data['bedrooms'] / input_data['bathrooms']
+
+    return preprocessor.transform(input_data)
+
+def parity_samples() -> list[HousePredictionRequest]:
+    """
+    Sample requests covering every valid location x condition, used for startup checks.
+    """
+    categories = {field: typing.get_args(HousePredictionRequest.model_fields[field].annotation)
+                  for field in CATEGORICAL_FIELDS}
+    numerical_samples = [(1527, 2, 1.5, 1956, 320), (3200, 5, 3.0, 2010, 180), (1100, 1, 1.0, 1945, 60)]
+    return [
+        HousePredictionRequest.model_construct(
+            sqft=sqft, bedrooms=bedrooms, bathrooms=bathrooms, location=location,
+            year_built=year_built, condition=condition, price_per_sqft=price_per_sqft
         )
-        
+        for location, condition, (sqft, bedrooms, bathrooms, year_built, price_per_sqft)
+        in itertools.product(categories['location'], categories['condition'], numerical_samples)
+    ]
+
+def check_feature_layout() -> bool:
+    """
+    Compare the fast encoder with preprocessor.transform on a grid of sample requests.
+    """
+    samples = parity_samples()
+    try:
+        expected = transform_requests(samples)
+        if hasattr(expected, 'toarray'):
+            expected = expected.toarray()
+        return np.allclose(encode_requests(samples), expected)
+    except Exception:
+        logger.exception("Fast feature encoder failed on the sample requests")
+        return False
+
+def check_onnx_session(sklearn_model) -> bool:
+    """
+    Compare the ONNX session with the sklearn model on the sample grid, so an
+    export left over from a previous training run is never served.
+    """
+    samples = parity_samples()
+    try:
+        features = encode_requests(samples) if feature_layout is not None else transform_requests(samples)
+        if hasattr(features, 'toarray'):
+            features = features.toarray()
+        input_name = onnx_session.get_inputs()[0].name
+        onnx_prices = onnx_session.run(None, {input_name: features.astype(np.float32)})[0].ravel()
+        # ONNX accumulates in float32, so allow differences up to a dollar
+        return np.allclose(onnx_prices, sklearn_model.predict(features), rtol=1e-5, atol=1.0)
+    except Exception:
+        # e.g. an export from a model trained on a different number of features
+        logger.exception("ONNX session failed on the sample requests")
+        return False
+
+def load_artifacts():
+    """
+    Load the model and preprocessor into this process. Repeated calls are no-ops,
+    so each worker deserializes the artifacts exactly once.
+    """
+    global model, preprocessor, onnx_session, feature_dtype, feature_layout
+    if model is not None:
+        return model
+
+    try:
+        logger.info(f"Loading model from {MODEL_PATH} (cwd: {os.getcwd()})")
+        # Numpy arrays of uncompressed artifacts are mapped read-only instead of copied
+        # (sklearn trees still copy their node arrays into their own buffers)
+        loaded_model = joblib.load(MODEL_PATH, mmap_mode='r')
+        preprocessor = joblib.load(PREPROCESSOR_PATH)
+        logger.info(f"Model loaded: {type(loaded_model).__name__}")
+        # Parallelism comes from API workers and request batching, not per-call thread pools
+        if hasattr(loaded_model, 'n_jobs'):
+            loaded_model.n_jobs = 1
+        logger.info(f"Preprocessor loaded from {PREPROCESSOR_PATH}")
+        onnx_session = load_onnx_session(ONNX_MODEL_PATH)
+        if onnx_session is not None:
+            logger.info(f"ONNX Runtime session loaded from {ONNX_MODEL_PATH}")
+        feature_dtype = model_feature_dtype(loaded_model, onnx_session)
     except Exception as e:
-        print(f"Error details: {str(e)}")
-        raise Exception(f"Prediction failed: {str(e)}")
+        logger.exception("Error loading model or preprocessor")
+        raise RuntimeError(f"Error loading model or preprocessor: {str(e)}") from e
+
+    feature_layout = build_feature_layout(preprocessor)
+    if feature_layout is not None and not check_feature_layout():
+        logger.warning("Fast feature encoder does not match the preprocessor, using preprocessor.transform")
+        feature_layout = None
+
+    if onnx_session is not None and not check_onnx_session(loaded_model):
+        logger.warning(f"{ONNX_MODEL_PATH} does not match {MODEL_PATH}, serving the sklearn model")
+        onnx_session = None
+        feature_dtype = model_feature_dtype(loaded_model, onnx_session)
+        if feature_layout is not None and not check_feature_layout():
+            feature_layout = None
+
+    model = loaded_model
+    return model
+
+def run_model(features: np.ndarray) -> np.ndarray:
+    """
+    Predict with ONNX Runtime when an exported model is available, else with sklearn.
+    """
+    if onnx_session is not None:
+        input_name = onnx_session.get_inputs()[0].name
+        return onnx_session.run(None, {input_name: features.astype(np.float32, copy=False)})[0].ravel()
+    return model.predict(features)
+
+def predict_price(request: HousePredictionRequest) -> PredictionResponse:
+    """
+    Predict house price based on input features.
+    """
+    return batch_predict([request])[0]
 
 def batch_predict(requests: list[HousePredictionRequest]) -> list[PredictionResponse]:
     """
-    Perform batch predictions.
+    Perform batch predictions with a single preprocessing and model call.
+    Requests already in the prediction cache are not sent to the model.
     """
-    return [predict_price(req) for req in requests]
\ No newline at end of file
+    if not requests:
+        return []
+
+    # Requests are frozen (hashable); the year is part of the key because house_age depends on it
+    year = current_year()
+    keys = [(year, request) for request in requests]
+    results = [prediction_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if missing:
+        to_predict = [requests[i] for i in missing]
+        try:
+            # ✅ PASO 1-3: Codificar features (sin pandas cuando el preprocessor lo permite)
+            if feature_layout is not None:
+                processed_features = encode_requests(to_predict)
+            else:
+                processed_features = transform_requests(to_predict)
+            
+            # ✅ PASO 4: Hacer predicción para todo el batch
+            predicted_prices = run_model(processed_features)
+            
+        except Exception:
+            logger.exception(f"Prediction failed for a batch of {len(to_predict)} requests")
+            raise
+
+        # Price and its 10% confidence interval for the whole batch, rounded in one go
+        rounded = np.round(predicted_prices[:, None] * CONFIDENCE_FACTORS, 2)
+        for i, (predicted_price, lower, upper) in zip(missing, rounded.tolist()):
+            results[i] = (predicted_price, lower, upper)
+            prediction_cache.put(keys[i], results[i])
+
+    prediction_time = datetime.now().isoformat()
+    return [
+        PredictionResponse(
+            predicted_price=predicted_price,
+            confidence_interval=[lower, upper],
+            features_importance={},
+            prediction_time=prediction_time
+        )
+        for predicted_price, lower, upper in results
+    ]
@@ -1,7 +1,44 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from .inference import predict_price, batch_predict
+from pydantic import TypeAdapter, ValidationError
+from .batching import Batcher
+from . import inference
+from .inference import batch_predict
 from .schemas import HousePredictionRequest, PredictionResponse
+from .utils import pin_worker_to_cpu
+
+# Request bodies are validated straight from the raw JSON bytes (no intermediate dict)
+batch_request_adapter = TypeAdapter(list[HousePredictionRequest])
+
+def validate_body(validate_json, body: bytes):
+    try:
+        return validate_json(body)
+    except ValidationError as e:
+        # Same error shape FastAPI produces for declared body parameters
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+
+# Raw-body routes don't register their request model, so openapi() adds it as a component
+REQUEST_SCHEMA_REF = {"$ref": "#/components/schemas/HousePredictionRequest"}
+
+def json_body(schema: dict) -> dict:
+    """OpenAPI request body for routes that read the raw request."""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+# Concurrent /predict calls are coalesced into one batch_predict call
+batcher = Batcher(batch_predict, max_batch=32, max_wait_ms=5)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pin_worker_to_cpu()
+    # Load the artifacts once per worker process, before any request is served
+    app.state.model = inference.load_artifacts()
+    await batcher.start()
+    yield
+    await batcher.stop()
 
 # Initialize FastAPI app with metadata
 app = FastAPI(
@@ -21,6 +58,7 @@ app = FastAPI(
         "name": "Apache 2.0",
         "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
     },
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -32,17 +70,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+default_openapi = app.openapi
+
+def openapi():
+    """Default OpenAPI document plus the HousePredictionRequest component referenced above."""
+    if app.openapi_schema is None:
+        schema = default_openapi()
+        schema.setdefault("components", {}).setdefault("schemas", {})["HousePredictionRequest"] = (
+            HousePredictionRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+        )
+    return app.openapi_schema
+
+app.openapi = openapi
+
 # Health check endpoint
 @app.get("/health", response_model=dict)
 async def health_check():
-    return {"status": "healthy", "model_loaded": True}
+    return {"status": "healthy", "model_loaded": inference.model is not None}
+
+# Prediction cache statistics
+@app.get("/cache/stats", response_model=dict)
+async def cache_stats():
+    return inference.prediction_cache.info()
 
 # Prediction endpoint
-@app.post("/predict", response_model=PredictionResponse)
-async def predict(request: HousePredictionRequest):
-    return predict_price(request)
+@app.post("/predict", response_model=PredictionResponse,
+          openapi_extra=json_body(REQUEST_SCHEMA_REF))
+async def predict(request: Request):
+    house = validate_body(HousePredictionRequest.model_validate_json, await request.body())
+    return await batcher.submit(house)
 
 # Batch prediction endpoint
-@app.post("/batch-predict", response_model=list)
-async def batch_predict_endpoint(requests: list[HousePredictionRequest]):
-    return batch_predict(requests)
\ No newline at end of file
+@app.post("/batch-predict", response_model=list,
+          openapi_extra=json_body({"type": "array", "items": REQUEST_SCHEMA_REF}))
+async def batch_predict_endpoint(request: Request):
+    houses = validate_body(batch_request_adapter.validate_json, await request.body())
+    # Predict off the event loop so /predict batching keeps running meanwhile
+    return await asyncio.to_thread(batch_predict, houses)
\ No newline at end of file
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import List, Literal
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
+
+__all__ = ["HousePredictionRequest", "PredictionResponse"]
 
 class HousePredictionRequest(BaseModel):
     sqft: float = Field(..., gt=1000, lt=5000, description="Square footage of the house")
@@ -8,10 +10,14 @@ class HousePredictionRequest(BaseModel):
     location: Literal["Rural", "Suburb", "Urban", "Downtown", "Waterfront", "Mountain"] = Field(..., description="Location type")
     year_built: int = Field(..., ge=1945, le=2023, description="Year the house was built")
     condition: Literal["Poor", "Fair", "Good", "Excellent"] = Field(..., description="Condition of the house")
-    price_per_sqft: float = Field(..., gt=50, lt=1000, description="Expected price per square foot in your area (e.g., 320)")
+    price_per_sqft: Optional[float] = Field(None, gt=50, lt=1000, description="Expected price per square foot in your area (e.g., 320). Defaults to a per-location estimate when omitted")
 
-    class Config:
-        schema_extra = {
+    # Strict: no string-to-number coercion; frozen: requests are immutable and hashable
+    model_config = ConfigDict(
+        strict=True,
+        frozen=True,
+        extra="forbid",
+        json_schema_extra={
             "example": {
                 "sqft": 1527,
                 "bedrooms": 2,
@@ -22,6 +28,7 @@ class HousePredictionRequest(BaseModel):
                 "price_per_sqft": 320
             }
         }
+    )
 
 class PredictionResponse(BaseModel):
     predicted_price: float = Field(..., description="Predicted house price in dollars")
@@ -29,12 +36,13 @@ class PredictionResponse(BaseModel):
     features_importance: dict = Field(default={}, description="Feature importance scores")
     prediction_time: str = Field(..., description="Timestamp of the prediction")
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "predicted_price": 489650.75,
                 "confidence_interval": [440685.68, 538615.82],
                 "features_importance": {},
                 "prediction_time": "2025-07-24T12:30:45.123456"
             }
-        }
\ No newline at end of file
+        }
+    )
\ No newline at end of file
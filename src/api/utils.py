@@ -0,0 +1,87 @@
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# CPU claimed by this worker and the lock file held for its lifetime
+_pinned_cpu = None
+_cpu_lock = None
+
+def pin_worker_to_cpu():
+    """
+    Pin the current worker process to a single CPU when PIN_WORKER_CPU=1.
+
+    Each worker claims the first free CPU by taking an exclusive flock on a
+    per-CPU lock file in CPU_LOCK_DIR (default: the temp dir). The kernel drops
+    the lock when a worker exits, so a restarted worker takes over the freed
+    CPU. Returns the CPU used, or None when pinning is off or every CPU is taken.
+    """
+    global _pinned_cpu, _cpu_lock
+    if os.getenv("PIN_WORKER_CPU") != "1" or not hasattr(os, "sched_setaffinity"):
+        return None
+    if _pinned_cpu is not None:
+        return _pinned_cpu
+
+    # POSIX-only, and only needed once pinning is enabled on a platform that supports it
+    import fcntl
+
+    lock_dir = os.getenv("CPU_LOCK_DIR", tempfile.gettempdir())
+    for cpu in sorted(os.sched_getaffinity(0)):
+        try:
+            lock = open(os.path.join(lock_dir, f"house-price-api-cpu-{cpu}.lock"), "w")
+        except OSError as e:
+            # e.g. a lock file left by another user in a shared temp dir
+            logger.warning(f"Skipping CPU {cpu}: cannot open its lock file ({e})")
+            continue
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            continue
+        _pinned_cpu, _cpu_lock = cpu, lock
+        os.sched_setaffinity(0, {cpu})
+        logger.info(f"Worker {os.getpid()} pinned to CPU {cpu}")
+        return cpu
+
+    logger.warning(f"Worker {os.getpid()} not pinned: every allowed CPU is already claimed")
+    return None
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return self.data[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def info(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "maxsize": self.maxsize,
+                "currsize": len(self.data),
+            }
@@ -1,4 +1,6 @@
 # src/features/engineer.py
+import os
+import tempfile
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -16,6 +18,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger('feature-engineering')
 
+def dump_artifact(obj, path):
+    """Dump to a temporary file next to `path`, then atomically swap it into place.
+
+    The API memory-maps artifacts; rewriting the file in place would change pages
+    under running processes, while os.replace leaves them on the old inode.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path, compress=0, protocol=5)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def create_features(df):
     """Create new features from existing data."""
     logger.info("Creating new features")
@@ -88,7 +107,7 @@ def run_feature_engineering(input_file, output_file, preprocessor_file):
     logger.info("Fitted the preprocessor and transformed the features")
     
     # Save the preprocessor
-    joblib.dump(preprocessor, preprocessor_file)
+    dump_artifact(preprocessor, preprocessor_file)
     logger.info(f"Saved preprocessor to {preprocessor_file}")
     
     # Save fully preprocessed data
@@ -1,4 +1,6 @@
 import argparse
+import os
+import tempfile
 import pandas as pd
 import numpy as np
 import joblib
@@ -46,6 +48,56 @@ def get_model_instance(name, params):
         raise ValueError(f"Unsupported model: {name}")
     return model_map[name](**params)
 
+# -----------------------------
+# Save artifacts
+# -----------------------------
+def dump_artifact(obj, path):
+    """Dump to a temporary file next to `path`, then atomically swap it into place.
+
+    The API memory-maps artifacts; rewriting the file in place would change pages
+    under running processes, while os.replace leaves them on the old inode.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path, compress=0, protocol=5)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# -----------------------------
+# Export model to ONNX
+# -----------------------------
+def remove_stale_onnx(path):
+    """Delete an ONNX export left by a previous run so the API can't serve an outdated model."""
+    if os.path.exists(path):
+        os.remove(path)
+        logger.warning(f"Removed stale ONNX export: {path}")
+
+def export_onnx(model, n_features, path):
+    """Export the model to ONNX so the API can serve it with ONNX Runtime (optional)."""
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        logger.warning("skl2onnx is not installed, skipping ONNX export")
+        remove_stale_onnx(path)
+        return None
+
+    try:
+        onnx_model = convert_sklearn(model, initial_types=[('input', FloatTensorType([None, n_features]))])
+    except Exception as e:
+        logger.warning(f"Could not convert {type(model).__name__} to ONNX: {e}")
+        remove_stale_onnx(path)
+        return None
+
+    with open(path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    return path
+
 # -----------------------------
 # Main logic
 # -----------------------------
@@ -160,8 +212,13 @@ def main(args):
 
         # Save model locally
         save_path = f"{args.models_dir}/trained/{model_name}.pkl"
-        joblib.dump(model, save_path)
+        # Uncompressed so the API can memory-map the arrays (joblib.load(..., mmap_mode='r'))
+        dump_artifact(model, save_path)
         logger.info(f"Saved trained model to: {save_path}")
+
+        onnx_path = export_onnx(model, X_train.shape[1], f"{args.models_dir}/trained/{model_name}.onnx")
+        if onnx_path:
+            logger.info(f"Exported ONNX model to: {onnx_path}")
         logger.info(f"Final MAE: {mae:.2f}, R²: {r2:.4f}")
 
 if __name__ == "__main__":